@@ -1,30 +1,52 @@
 import socket
 import struct
-import json
+import time
+import zlib
 
 from abc import ABC, abstractmethod
+from collections import OrderedDict
 
-from datetime import datetime
 from pyfastocloud.client_constants import ClientStatus
 from pyfastocloud.client_handler import IClientHandler
-from pyfastocloud.json_rpc import Request, Response, parse_response_or_request, JSONRPC_OK_RESULT, JsonRPCErrorCode
+from pyfastocloud.json_rpc import Request, Response, parse_response_or_request, json_dumps, JSONRPC_OK_RESULT, \
+    JsonRPCErrorCode
 from pyfastocloud.compressor_zlib import CompressorZlib
+from pyfastocloud.compressor_libdeflate import CompressorLibdeflate
+
+# precompiled structs beat int.from_bytes/to_bytes for the framing fields and
+# unpack_from/pack_into work on the buffers in place, without slicing
+_LEN_BE = struct.Struct('>I')  # frame length prefix, network order
+_GZIP_TRAILER = struct.Struct('<II')  # crc32, uncompressed size
+_GZIP_CRC = struct.Struct('<I')
 
 
 def make_utc_timestamp_seconds() -> int:
-    return int(datetime.now().timestamp())
+    return int(time.time())
 
 
 def make_utc_timestamp_msec() -> int:
-    return make_utc_timestamp_seconds() * 1000
+    return int(time.time() * 1000)
 
 
 def generate_seq_id(command_id):  # uint64_t
     if command_id is None:
         return None
 
-    converted_bytes = command_id.to_bytes(8, byteorder='big')
-    return converted_bytes.hex()
+    return format(command_id, '016x')
+
+
+def make_compression_dictionary(*namespaces) -> bytes:
+    # zlib preset dictionary from Commands/Fields string constants, most common tokens go last
+    words = []
+    for namespace in namespaces:
+        for key, value in vars(namespace).items():
+            if not key.startswith('_') and isinstance(value, str):
+                words.append('"{0}"'.format(value))
+    words.append('{"method":"')
+    words.append('","params":{')
+    words.append('{"result":')
+    words.append('"jsonrpc":"2.0","id":"')
+    return ''.join(words).encode()
 
 
 def generate_json_rpc_response_message(result, command_id: str) -> Response:
@@ -37,6 +59,12 @@ def generate_json_rpc_response_error(message: str, code: int, command_id: str) -
 
 class Client(ABC):
     MAX_PACKET_SIZE = 64 * 1024 * 1024
+    RECV_CHUNK_SIZE = 16 * 1024
+    WRITE_BUFFER_SIZE = 64 * 1024  # coalesced writes are flushed beyond this
+    MAX_REQUEST_QUEUE_SIZE = 1024  # oldest requests without a response are dropped beyond this
+    MIN_COMPRESS_SIZE = 96  # smaller payloads are sent as stored deflate blocks
+    USE_LIBDEFLATE = True  # falls back to zlib if libdeflate bindings are not installed
+    COMPRESSION_DICTIONARY = None  # zlib preset dictionary instead of gzip, the peer must use the same one
 
     def is_active(self):
         return self._state == ClientStatus.ACTIVE
@@ -45,7 +73,7 @@ class Client(ABC):
         def closure(self, *args, **kwargs):
             if not self.is_active():
                 return
-            return func(self, *args, *kwargs)
+            return func(self, *args, **kwargs)
 
         return closure
 
@@ -68,23 +96,67 @@ class Client(ABC):
         if not self.is_connected():
             return None
 
-        try:
-            data_size_bytes = self._recv(4)
-        except socket.error:
-            return None
+        if self._rxlarge is not None:
+            return self._recv_large_command()
+
+        while True:
+            data_size = self._buffered_command_size()
+            missing = 4 - len(self._rxbuf)
+            if data_size is not None:
+                if data_size > Client.MAX_PACKET_SIZE:
+                    return None
+
+                frame_end = 4 + data_size
+                if len(self._rxbuf) >= frame_end:
+                    data = bytes(self._rxbuf[4:frame_end])
+                    del self._rxbuf[:frame_end]
+                    return data
+
+                missing = frame_end - len(self._rxbuf)
+                if missing > Client.RECV_CHUNK_SIZE:
+                    # move the frame out of the receive buffer, it is completed in place
+                    self._rxlarge = bytearray(data_size)
+                    self._rxlarge_offset = len(self._rxbuf) - 4
+                    self._rxlarge[:self._rxlarge_offset] = self._rxbuf[4:]
+                    self._rxbuf.clear()
+                    return self._recv_large_command()
+
+            # without read batching never read past the current frame, so select keeps seeing the next one
+            if not self._recv_chunk(Client.RECV_CHUNK_SIZE if self._batch_reads else missing):
+                return None
 
-        if not data_size_bytes:
-            return None
+    def set_read_batching(self, enabled: bool):
+        # read_command may read several frames per syscall, the extra ones stay in the receive buffer
+        # and don't make socket() readable, the caller must drain them while has_buffered_command() is True
+        self._batch_reads = enabled
 
-        data_size = struct.unpack('>I', data_size_bytes)[0]
-        if data_size > Client.MAX_PACKET_SIZE:
-            return None
+    def set_write_coalescing(self, enabled: bool):
+        # buffer outgoing frames until flush, a full buffer or the next blocking read_command,
+        # the caller must flush() after process_commands in each loop iteration or replies may stall
+        self._coalesce_writes = enabled
+        if not enabled:
+            self.flush()
+
+    def flush(self) -> bool:
+        if not self._txbuf:
+            return True
+
+        if not self.is_connected():
+            self._txbuf.clear()
+            return False
 
         try:
-            data = self._recv(data_size)
+            self._socket.sendall(self._txbuf)
         except socket.error:
-            return None
-        return data
+            return False
+        finally:
+            self._txbuf.clear()
+        return True
+
+    def has_buffered_command(self) -> bool:
+        # frames already read from the socket won't wake up select, drain them with read_command
+        data_size = self._buffered_command_size()
+        return data_size is not None and len(self._rxbuf) >= 4 + data_size
 
     @abstractmethod
     def process_commands(self, data: bytes):
@@ -97,6 +169,8 @@ class Client(ABC):
         try:
             sock = self.create_tcp_socket()
             sock.connect((host, port))
+            # frames are written in one call, don't let Nagle hold small ones back
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
         except socket.error as exc:
             return None
 
@@ -106,14 +180,31 @@ class Client(ABC):
     def __init__(self, sock, state: ClientStatus, handler: IClientHandler, socket_mod):
         self._handler = handler
         self._socket = sock
-        self._request_queue = dict()
+        self._request_queue = OrderedDict()
+        self._rxbuf = bytearray()
+        self._rxlarge = None
+        self._rxlarge_offset = 0
+        self._batch_reads = False
+        self._txbuf = bytearray()
+        self._coalesce_writes = False
+        self._rxchunk = bytearray(Client.RECV_CHUNK_SIZE)
         self._state = state
-        self._gzip_compress = CompressorZlib(True)
+        if self.COMPRESSION_DICTIONARY:
+            self._gzip_compress = CompressorZlib(False, self.COMPRESSION_DICTIONARY)
+        elif self.USE_LIBDEFLATE and CompressorLibdeflate.is_available():
+            self._gzip_compress = CompressorLibdeflate()
+        else:
+            self._gzip_compress = CompressorZlib(True)
         self._socket_mod = socket_mod
+        self._response_ok_template = self._make_response_ok_template()
 
     def _reset(self):
+        # coalesced frames were already reported as sent, write them out before closing
+        self.flush()
         self._socket.close()
         self._socket = None
+        self._rxbuf.clear()
+        self._rxlarge = None
         self._set_state(ClientStatus.INIT)
 
     def _set_state(self, status: ClientStatus):
@@ -126,63 +217,138 @@ class Client(ABC):
             return False
 
         cid = generate_seq_id(command_id)
-        req = Request(cid, method, params)
-
-        data = json.dumps(req.to_dict())
-        data_to_send_bytes = self._generate_data_to_send(data)
-        if not req.is_notification():
-            self._request_queue[cid] = req
+        if cid:
+            data = json_dumps({'method': method, 'params': params, 'jsonrpc': '2.0', 'id': cid})
+            # only requests waiting for a response are kept as objects
+            self._request_queue[cid] = Request(cid, method, params)
+            if len(self._request_queue) > Client.MAX_REQUEST_QUEUE_SIZE:
+                self._request_queue.popitem(last=False)
+        else:
+            data = json_dumps({'method': method, 'params': params, 'jsonrpc': '2.0'})
+
+        header, body = self._generate_data_to_send(data)
+        return self._send_frame(header, body)
+
+    def _generate_data_to_send(self, data: bytes) -> (bytes, bytes):
+        if len(data) < Client.MIN_COMPRESS_SIZE:
+            compressed = self._gzip_compress.store(data)
+        else:
+            compressed = self._gzip_compress.compress(data)
+        return _LEN_BE.pack(len(compressed)), compressed
+
+    def _send_frame(self, header: bytes, body: bytes) -> bool:
+        if self._coalesce_writes:
+            self._txbuf += header
+            self._txbuf += body
+            if len(self._txbuf) > Client.WRITE_BUFFER_SIZE:
+                return self.flush()
+            return True
+
+        # vectored send, header and body are not concatenated
         try:
-            self._socket.send(data_to_send_bytes)
+            sent = 0
+            if hasattr(self._socket, 'sendmsg'):
+                try:
+                    sent = self._socket.sendmsg([header, body])
+                except NotImplementedError:  # ssl sockets have sendmsg but don't support it
+                    pass
+
+            # sendmsg may write only part of the frame (or nothing), finish it so framing stays intact
+            header_len = len(header)
+            if sent < header_len:
+                self._socket.sendall(header[sent:])
+                sent = header_len
+            if sent - header_len < len(body):
+                self._socket.sendall(memoryview(body)[sent - header_len:])
         except socket.error:
             return False
         return True
 
-    def _generate_data_to_send(self, data: str) -> bytes:
-        compressed = self._gzip_compress.compress(data.encode())
-        compressed_len = len(compressed)
-        array = struct.pack(">I", compressed_len)
-        return array + compressed
-
     def _send_notification(self, method: str, params) -> bool:
         return self._send_request(None, method, params)
 
     def _send_response(self, command_id: str, params) -> bool:
-        resp = generate_json_rpc_response_message(params, command_id)
-        data = json.dumps(resp.to_dict())
-        data_to_send_bytes = self._generate_data_to_send(data)
-        try:
-            self._socket.send(data_to_send_bytes)
-        except socket.error:
-            return False
-        return True
+        data = json_dumps({'result': params, 'jsonrpc': '2.0', 'id': command_id})
+        header, body = self._generate_data_to_send(data)
+        return self._send_frame(header, body)
 
     def _send_response_ok(self, command_id: str) -> bool:
+        if self._response_ok_template and isinstance(command_id, str):
+            cid = command_id.encode()
+            # ascii alphanumeric ids need no json escaping, splice them into the prebuilt frame
+            if len(cid) == 16 and cid.isalnum():
+                header, body, cid_offset, prefix_crc, suffix = self._response_ok_template
+                body = bytearray(body)
+                body[cid_offset:cid_offset + 16] = cid
+                crc = zlib.crc32(suffix, zlib.crc32(cid, prefix_crc))
+                _GZIP_CRC.pack_into(body, len(body) - 8, crc)
+                return self._send_frame(header, body)
+
         return self._send_response(command_id, JSONRPC_OK_RESULT)
 
+    def _make_response_ok_template(self):
+        # OK response frame with a placeholder id, stored uncompressed so the id can be patched in place;
+        # only plain gzip streams are supported, the payload crc32 is rewritten in the trailer
+        if self._gzip_compress.name() != 'gzip':
+            return None
+
+        placeholder = b'0' * 16
+        payload = json_dumps({'result': JSONRPC_OK_RESULT, 'jsonrpc': '2.0', 'id': placeholder.decode()})
+        if len(payload) >= Client.MIN_COMPRESS_SIZE or payload.count(placeholder) != 1:
+            return None
+
+        header, body = self._generate_data_to_send(payload)
+        payload_offset = body.find(payload)
+        if payload_offset < 0 or body[-8:] != _GZIP_TRAILER.pack(zlib.crc32(payload), len(payload)):
+            return None
+
+        id_offset = payload.find(placeholder)
+        prefix_crc = zlib.crc32(payload[:id_offset])
+        suffix = payload[id_offset + len(placeholder):]
+        return header, body, payload_offset + id_offset, prefix_crc, suffix
+
     def _send_response_fail(self, command_id: str, error: str) -> bool:
-        resp = generate_json_rpc_response_error(error, JsonRPCErrorCode.JSON_RPC_SERVER_ERROR, command_id)
-        data = json.dumps(resp.to_dict())
-        data_to_send_bytes = self._generate_data_to_send(data)
+        data = json_dumps({'error': {'code': JsonRPCErrorCode.JSON_RPC_SERVER_ERROR, 'message': error},
+                           'jsonrpc': '2.0', 'id': command_id})
+        header, body = self._generate_data_to_send(data)
+        return self._send_frame(header, body)
+
+    def _recv_chunk(self, n: int) -> bool:
+        # Helper function to append up to n available bytes to the receive buffer, False if EOF is hit
+        if self._txbuf:
+            self.flush()
         try:
-            self._socket.send(data_to_send_bytes)
+            received = self._socket.recv_into(self._rxchunk, n)
         except socket.error:
             return False
+        if not received:
+            return False
+        self._rxbuf += memoryview(self._rxchunk)[:received]
         return True
 
-    def _recv(self, n: int):
-        # Helper function to recv n bytes or return None if EOF is hit
-        data = b''
-        while len(data) < n:
-            try:
-                packet = self._socket.recv(n - len(data))
-            except socket.error:
-                return None
-            if not packet:
-                return None
-            data += packet
-        return data
+    def _recv_large_command(self):
+        # Helper function to recv the rest of a large frame straight into its own buffer, None if EOF is hit;
+        # an interrupted read keeps the partial frame, the next read_command resumes it
+        if self._txbuf:
+            self.flush()
+        data = self._rxlarge
+        with memoryview(data) as view:
+            while self._rxlarge_offset < len(data):
+                try:
+                    received = self._socket.recv_into(view[self._rxlarge_offset:])
+                except socket.error:
+                    return None
+                if not received:
+                    return None
+                self._rxlarge_offset += received
+        self._rxlarge = None
+        return bytes(data)
+
+    def _buffered_command_size(self):
+        if len(self._rxbuf) < 4:
+            return None
+        return _LEN_BE.unpack_from(self._rxbuf, 0)[0]
 
     def _decode_response_or_request(self, data: bytes) -> (Request, Response):
         decoded_data = self._gzip_compress.decompress(data)
-        return parse_response_or_request(decoded_data.decode())
+        return parse_response_or_request(decoded_data)
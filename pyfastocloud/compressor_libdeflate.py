@@ -0,0 +1,30 @@
+from pyfastocloud.compressor_zlib import CompressorZlib
+
+try:
+    import deflate
+except ImportError:
+    deflate = None
+
+
+class CompressorLibdeflate:
+    def __init__(self, level=9):
+        self.level = level
+        # stored blocks are written by zlib, libdeflate is used for real compression only
+        self.stored = CompressorZlib(True)
+
+    @staticmethod
+    def is_available() -> bool:
+        return deflate is not None
+
+    def compress(self, data: bytes) -> bytes:
+        return deflate.gzip_compress(data, self.level)
+
+    def store(self, data: bytes) -> bytes:
+        return self.stored.store(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        # gzip trailer carries the uncompressed size, libdeflate reads it from there
+        return deflate.gzip_decompress(data)
+
+    def name(self):
+        return 'gzip'
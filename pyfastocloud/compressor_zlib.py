@@ -1,13 +1,24 @@
+import struct
 import zlib
 
+# stored streams are written by hand, no deflate state is involved
+_GZIP_STORED_HEADER = b'\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\x03'  # no flags, mtime 0, unix
+_ZLIB_STORED_HEADER = b'\x78\x01'  # 32K window, no dictionary
+_GZIP_TRAILER = struct.Struct('<II')  # crc32, uncompressed size
+_ZLIB_TRAILER = struct.Struct('>I')  # adler32
+_STORED_BLOCK = struct.Struct('<BHH')  # final flag, len, ~len
+_MAX_STORED_BLOCK = 0xffff
+
 
 class CompressorZlib:
-    def __init__(self, gzip=False):
+    def __init__(self, gzip=False, zdict=None):
+        # gzip streams can't carry a preset dictionary, zdict is used only for zlib
         zl = zlib.MAX_WBITS | 16 if gzip else zlib.MAX_WBITS
-        c = zlib.compressobj(9, zlib.DEFLATED, zl)
+        zd = {'zdict': zdict} if zdict and not gzip else {}
+        c = zlib.compressobj(9, zlib.DEFLATED, zl, **zd)
         self.c_context = c.copy()
 
-        d = zlib.decompressobj(zl)
+        d = zlib.decompressobj(zl, **zd)
         self.d_context = d.copy()
         self.is_gzlip = gzip
 
@@ -17,6 +28,26 @@ class CompressorZlib:
         t2 = c.flush(zlib.Z_FINISH)
         return t + t2
 
+    def store(self, data: bytes) -> bytes:
+        # valid gzip/zlib stream of uncompressed deflate blocks
+        parts = [_GZIP_STORED_HEADER if self.is_gzlip else _ZLIB_STORED_HEADER]
+        view = memoryview(data)
+        offset = 0
+        while True:
+            block = view[offset:offset + _MAX_STORED_BLOCK]
+            offset += len(block)
+            final = offset >= len(data)
+            parts.append(_STORED_BLOCK.pack(final, len(block), len(block) ^ 0xffff))
+            parts.append(block)
+            if final:
+                break
+
+        if self.is_gzlip:
+            parts.append(_GZIP_TRAILER.pack(zlib.crc32(data), len(data) & 0xffffffff))
+        else:
+            parts.append(_ZLIB_TRAILER.pack(zlib.adler32(data)))
+        return b''.join(parts)
+
     def decompress(self, data: bytes) -> bytes:
         d = self.d_context.copy()
         t = d.decompress(data)
@@ -66,15 +66,19 @@ class FastoCloudClient(Client):
         command_args = {Fields.LICENSE_KEY: license_key}
         return self._send_request(command_id, Commands.ACTIVATE_COMMAND, command_args)
 
-    @Client.is_active_decorator
     def ping(self, command_id: int):
+        if self._state != ClientStatus.ACTIVE:
+            return
+
         command_args = {Fields.TIMESTAMP: make_utc_timestamp_msec()}
         return self._send_request(command_id, Commands.SERVICE_PING_COMMAND, command_args)
 
-    @Client.is_active_decorator
     def prepare_service(self, command_id: int, feedback_directory: str, timeshifts_directory: str, hls_directory: str,
                         playlists_directory: str, dvb_directory: str, capture_card_directory: str,
                         vods_in_directory: str, vods_directory: str, cods_directory: str):
+        if self._state != ClientStatus.ACTIVE:
+            return
+
         command_args = {
             Fields.FEEDBACK_DIRECTORY: feedback_directory,
             Fields.TIMESHIFTS_DIRECTORY: timeshifts_directory,
@@ -88,43 +92,59 @@ class FastoCloudClient(Client):
         }
         return self._send_request(command_id, Commands.PREPARE_SERVICE_COMMAND, command_args)
 
-    @Client.is_active_decorator
     def sync_service(self, command_id: int, streams: list) -> bool:
+        if self._state != ClientStatus.ACTIVE:
+            return
+
         command_args = {Fields.STREAMS: streams}
         return self._send_request(command_id, Commands.SYNC_SERVICE_COMMAND, command_args)
 
-    @Client.is_active_decorator
     def stop_service(self, command_id: int, delay: int) -> bool:
+        if self._state != ClientStatus.ACTIVE:
+            return
+
         command_args = {Fields.DELAY: delay}
         return self._send_request(command_id, Commands.STOP_SERVICE_COMMAND, command_args)
 
-    @Client.is_active_decorator
     def get_log_service(self, command_id: int, path: str) -> bool:
+        if self._state != ClientStatus.ACTIVE:
+            return
+
         command_args = {Fields.PATH: path}
         return self._send_request(command_id, Commands.GET_LOG_SERVICE_COMMAND, command_args)
 
-    @Client.is_active_decorator
     def start_stream(self, command_id: int, config: dict) -> bool:
+        if self._state != ClientStatus.ACTIVE:
+            return
+
         command_args = {Fields.CONFIG: config}
         return self._send_request(command_id, Commands.START_STREAM_COMMAND, command_args)
 
-    @Client.is_active_decorator
     def stop_stream(self, command_id: int, stream_id: str) -> bool:
+        if self._state != ClientStatus.ACTIVE:
+            return
+
         command_args = {Fields.STREAM_ID: stream_id}
         return self._send_request(command_id, Commands.STOP_STREAM_COMMAND, command_args)
 
-    @Client.is_active_decorator
     def restart_stream(self, command_id: int, stream_id: str) -> bool:
+        if self._state != ClientStatus.ACTIVE:
+            return
+
         command_args = {Fields.STREAM_ID: stream_id}
         return self._send_request(command_id, Commands.RESTART_STREAM_COMMAND, command_args)
 
-    @Client.is_active_decorator
     def get_log_stream(self, command_id: int, stream_id: str, feedback_directory: str, path: str) -> bool:
+        if self._state != ClientStatus.ACTIVE:
+            return
+
         command_args = {Fields.STREAM_ID: stream_id, Fields.FEEDBACK_DIRECTORY: feedback_directory, Fields.PATH: path}
         return self._send_request(command_id, Commands.GET_LOG_STREAM_COMMAND, command_args)
 
-    @Client.is_active_decorator
     def get_pipeline_stream(self, command_id: int, stream_id: str, feedback_directory: str, path: str) -> bool:
+        if self._state != ClientStatus.ACTIVE:
+            return
+
         command_args = {Fields.STREAM_ID: stream_id, Fields.FEEDBACK_DIRECTORY: feedback_directory, Fields.PATH: path}
         return self._send_request(command_id, Commands.GET_PIPELINE_STREAM_COMMAND, command_args)
 
@@ -134,23 +154,36 @@ class FastoCloudClient(Client):
 
         req, resp = self._decode_response_or_request(data)
         if req:
-            if req.method == Commands.CLIENT_PING_COMMAND:
-                self.__pong(req.id)
+            handler = self._REQ_DISPATCH.get(req.method)
+            if handler:
+                handler(self, req.id)
 
             if self._handler:
                 self._handler.process_request(self, req)
         elif resp:
             saved_req = self._request_queue.pop(resp.id, None)
-            if saved_req and saved_req.method == Commands.ACTIVATE_COMMAND and resp.is_message():
-                self._set_state(ClientStatus.ACTIVE)
-            elif saved_req and saved_req.method == Commands.STOP_SERVICE_COMMAND and resp.is_message():
-                self._reset()
+            if saved_req and resp.is_message():
+                handler = self._RESP_DISPATCH.get(saved_req.method)
+                if handler:
+                    handler(self)
 
             if self._handler:
                 self._handler.process_response(self, saved_req, resp)
 
     # private
-    @Client.is_active_decorator
     def __pong(self, command_id: str):
+        if self._state != ClientStatus.ACTIVE:
+            return
+
         ts = make_utc_timestamp_msec()
         self._send_response(command_id, {Fields.TIMESTAMP: ts})
+
+    def __activated(self):
+        self._set_state(ClientStatus.ACTIVE)
+
+    def __service_stopped(self):
+        self._reset()
+
+    # incoming requests and successful responses to our requests, keyed by method
+    _REQ_DISPATCH = {Commands.CLIENT_PING_COMMAND: __pong}
+    _RESP_DISPATCH = {Commands.ACTIVATE_COMMAND: __activated, Commands.STOP_SERVICE_COMMAND: __service_stopped}
@@ -1,5 +1,10 @@
 import json
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 JSONRPC_OK_RESULT = 'OK'
 
 
@@ -79,10 +84,23 @@ class Response:
         return dict()
 
 
+# json functions, orjson is used if installed
+def json_dumps(data) -> bytes:
+    if orjson:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data).encode()
+
+
+def json_loads(data: bytes):
+    if orjson:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
 # rpc functions
-def parse_response_or_request(data: str) -> (Request, Response):
+def parse_response_or_request(data: bytes) -> (Request, Response):
     try:
-        resp_req = json.loads(data)
+        resp_req = json_loads(data)
     except ValueError as e:
         return None, None
 
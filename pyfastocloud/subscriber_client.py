@@ -17,6 +17,15 @@ class Commands:
 
 class Fields:
     TIMESTAMP = 'timestamp'
+    DEVICES = 'devices'
+    CHANNELS = 'channels'
+    VODS = 'vods'
+    BANDWIDTH_HOST = 'bandwidth_host'
+    STREAM_ID = 'id'
+    WATCHERS = 'watchers'
+    MESSAGE = 'message'
+    MESSAGE_TYPE = 'type'
+    SHOW_TIME = 'show_time'
 
 
 class SubscriberClient(Client):
@@ -29,7 +38,7 @@ class SubscriberClient(Client):
 
     # responses
     def activate_device_success(self, command_id: str, devices: list) -> bool:
-        command_args = {'devices': devices}
+        command_args = {Fields.DEVICES: devices}
         result = self._send_response(command_id, command_args)
         if not result:
             return False
@@ -54,37 +63,49 @@ class SubscriberClient(Client):
         return self.login_fail(command_id, error)
 
     def get_channels_success(self, command_id: str, channels: list, vods: list) -> bool:
-        command_args = {'channels': channels, 'vods': vods}
+        command_args = {Fields.CHANNELS: channels, Fields.VODS: vods}
         return self._send_response(command_id, command_args)
 
-    @Client.is_active_decorator
     def get_server_info_success(self, command_id: str, bandwidth_host: str) -> bool:
-        command_args = {'bandwidth_host': bandwidth_host}
+        if self._state != ClientStatus.ACTIVE:
+            return
+
+        command_args = {Fields.BANDWIDTH_HOST: bandwidth_host}
         return self._send_response(command_id, command_args)
 
-    @Client.is_active_decorator
     def get_runtime_channel_info_success(self, command_id: str, sid: str, watchers: int) -> bool:
-        command_args = {'id': sid, 'watchers': watchers}
+        if self._state != ClientStatus.ACTIVE:
+            return
+
+        command_args = {Fields.STREAM_ID: sid, Fields.WATCHERS: watchers}
         return self._send_response(command_id, command_args)
 
-    @Client.is_active_decorator
     def pong(self, command_id: str) -> bool:
+        if self._state != ClientStatus.ACTIVE:
+            return
+
         ts = make_utc_timestamp_msec()
         return self._send_response(command_id, {Fields.TIMESTAMP: ts})
 
     # requests
-    @Client.is_active_decorator
     def ping(self, command_id: int) -> bool:
+        if self._state != ClientStatus.ACTIVE:
+            return
+
         return self._send_request(command_id, Commands.SERVER_PING, {Fields.TIMESTAMP: make_utc_timestamp_msec()})
 
-    @Client.is_active_decorator
     def get_client_info(self, command_id: int) -> bool:
+        if self._state != ClientStatus.ACTIVE:
+            return
+
         command_args = {}
         return self._send_request(command_id, Commands.SERVER_GET_CLIENT_INFO, command_args)
 
-    @Client.is_active_decorator
     def send_message(self, command_id: int, message: str, message_type: int, ttl: int) -> bool:
-        command_args = {'message': message, 'type': message_type, 'show_time': ttl}
+        if self._state != ClientStatus.ACTIVE:
+            return
+
+        command_args = {Fields.MESSAGE: message, Fields.MESSAGE_TYPE: message_type, Fields.SHOW_TIME: ttl}
         return self._send_request(command_id, Commands.SERVER_SEND_MESSAGE, command_args)
 
     def process_commands(self, data: bytes):
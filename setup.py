@@ -23,6 +23,12 @@ VERSION = None
 # What packages are required for this module to be executed?
 REQUIRED = []
 
+# What packages are optional?
+EXTRAS = {
+    'libdeflate': ['deflate'],
+    'orjson': ['orjson'],
+}
+
 # The rest you shouldn't have to touch too much :)
 # ------------------------------------------------
 # Except, perhaps the License and Trove Classifiers!
@@ -99,6 +105,7 @@ setup(
     #     'console_scripts': ['mycli=mymodule:cli'],
     # },
     install_requires=REQUIRED,
+    extras_require=EXTRAS,
     include_package_data=True,
     license='LGPL',
     classifiers=[